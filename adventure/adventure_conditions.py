@@ -0,0 +1,669 @@
+#!/usr/bin/env python3
+"""
+**************************************************************************
+**
+**   adventure_conditions.py - Condition Grammar for Adventure
+**
+**   Version 1 revision 0
+**
+**************************************************************************
+This module is released under the MIT License:
+==========================================================================
+
+Copyright 2025 Jeffrey R. Day
+
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the “Software”),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+
+#*************************************************************************
+
+The tokenizer and parser for Adventure's flag conditions, without any
+dependency on Ren'Py, so room conditions can also be checked from the
+command line:
+
+    python adventure_conditions.py game/room_data.rpy --flags flags.txt
+
+The flags and variables files list one declared name per line (commas
+also separate names, and # starts a comment).  Without --flags only the
+syntax is checked.
+"""
+
+import ast
+import operator
+import sys
+import textwrap
+
+COMPARISONS = {
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+    '==': operator.eq,
+    '!=': operator.ne,
+}
+NEGATED_COMPARISONS = {
+    '<': '>=',
+    '<=': '>',
+    '>': '<=',
+    '>=': '<',
+    '==': '!=',
+    '!=': '==',
+}
+
+# <def>
+def tokenize(condition):
+    tokens = []
+    i = 0
+    # <while>
+    while i < len(condition):
+        char = condition[i]
+        # <if>
+        if char.isspace():
+            i += 1
+            continue
+        # </if>
+        # <if>
+        if char in '<>=!' and condition[i:i + 2] in COMPARISONS:
+            tokens.append(('CMP', condition[i:i + 2]))
+            i += 2
+        elif char in '<>':
+            tokens.append(('CMP', char))
+            i += 1
+        elif char.isdigit() or (char in '-.' and condition[i + 1:i + 2].isdigit()):
+            start = i
+            i += 1
+            # <while>
+            while i < len(condition) and (condition[i].isdigit() or condition[i] == '.'):
+                i += 1
+            # </while>
+            number = condition[start:i]
+            # <try>
+            try:
+                tokens.append(('NUMBER', float(number) if '.' in number else int(number)))
+            except ValueError:
+                raise ValueError(f"Invalid number: '{number}' at position {start}")
+            # </try>
+        elif char in '&|!()':
+            # <if>
+            if char == '&':
+                tokens.append(('AND', char))
+            elif char == '|':
+                tokens.append(('OR', char))
+            elif char == '!':
+                tokens.append(('NOT', char))
+            elif char == '(':
+                tokens.append(('LPAREN', char))
+            elif char == ')':
+                tokens.append(('RPAREN', char))
+            # </if>
+            i += 1
+        # Handle flag names (start with letter or underscore)
+        elif char.isalpha() or char == '_':
+            start = i
+            # Continue while we have valid flag name characters
+            # <while>
+            while i < len(condition) and (condition[i].isalnum() or condition[i] in '_.'):
+                i += 1
+            # </while>
+            # A trailing ".*" matches every flag under that namespace
+            # <if>
+            if i < len(condition) and condition[i] == '*' and condition[i - 1] == '.':
+                i += 1
+            # </if>
+            flag_name = condition[start:i]
+            tokens.append(('FLAG', flag_name))
+        else:
+            raise ValueError(f"Invalid character: '{char}' at position {i}")
+        # </if>
+
+    return tokens
+# </def tokenize>
+
+# <class>
+class BaseConditionProcessor:
+    # <def>
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.pos = 0
+    # </def>
+    # <def>
+    def current_token(self):
+        # <if>
+        if self.pos < len(self.tokens):
+            return self.tokens[self.pos]
+        # </if>
+        return None
+    # </def>
+    # <def>
+    def consume(self, expected_type=None):
+        token = self.current_token()
+        # <if>
+        if token and (expected_type is None or token[0] == expected_type):
+            self.pos += 1
+            return token
+        # </if>
+        return None
+    # </def>
+    # <def>
+    def process(self):
+        """Main entry point - subclasses should call this"""
+        result = self.process_or()
+        # <if>
+        if self.current_token() is not None:
+            raise ValueError(f"Unexpected token: {self.current_token()}")
+        # </if>
+        return result
+    # </def>
+    # <def>
+    def process_or(self):
+        """Process OR expressions (lowest precedence)"""
+        left = self.process_and()
+        # <while>
+        while self.current_token() and self.current_token()[0] == 'OR':
+            self.consume('OR')
+            right = self.process_and()
+            left = self.combine_or(left, right)
+        # </while>
+
+        return left
+    # </def>
+    # <def>
+    def process_and(self):
+        """Process AND expressions (higher precedence than OR)"""
+        left = self.process_not()
+        # <while>
+        while self.current_token() and self.current_token()[0] == 'AND':
+            self.consume('AND')
+            right = self.process_not()
+            left = self.combine_and(left, right)
+        # </while>
+        return left
+    # </def>
+    # <def>
+    def process_not(self):
+        """Process NOT expressions (highest precedence except parentheses)"""
+        # <if>
+        if self.current_token() and self.current_token()[0] == 'NOT':
+            self.consume('NOT')
+            operand = self.process_primary()
+            return self.combine_not(operand)
+        else:
+            return self.process_primary()
+        # </if>
+    # </def>
+    # <def>
+    def process_primary(self):
+        """Process primary expressions (flags and parentheses)"""
+        token = self.current_token()
+        # <if>
+        if not token:
+            raise ValueError("Unexpected end of expression")
+        # </if>
+        # <if>
+        if token[0] == 'FLAG':
+            flag_name = self.consume('FLAG')[1]
+            comparison = self.consume('CMP')
+            # <if>
+            if comparison:
+                number = self.consume('NUMBER')
+                # <if>
+                if not number:
+                    raise ValueError(f"Invalid comparison: {flag_name} {comparison[1]}")
+                # </if>
+                return self.handle_comparison(flag_name, comparison[1], number[1])
+            # </if>
+            return self.handle_flag(flag_name)
+        elif token[0] == 'LPAREN':
+            self.consume('LPAREN')
+            result = self.process_or()  # Start fresh with OR precedence
+            # <if>
+            if not self.consume('RPAREN'):
+                raise ValueError("Missing closing parenthesis")
+            # </if>
+            return result
+        else:
+            raise ValueError(f"Unexpected token: {token}")
+        # </if>
+    # </def>
+
+    # Abstract methods that subclasses must implement
+    # <def>
+    def combine_or(self, left, right):
+        raise NotImplementedError
+    # </def>
+    # <def>
+    def combine_and(self, left, right):
+        raise NotImplementedError
+    # </def>
+    # <def>
+    def combine_not(self, operand):
+        raise NotImplementedError
+    # </def>
+    # <def>
+    def handle_flag(self, flag_name):
+        raise NotImplementedError
+    # </def>
+    # <def>
+    def handle_comparison(self, var_name, op, number):
+        raise NotImplementedError
+    # </def>
+# </class BaseConditionProcessor>
+
+# <class>
+class ConditionValidator(BaseConditionProcessor):
+    """Validates syntax only - unknown flags are handled separately"""
+    # <def>
+    def __init__(self, tokens, known_flags):
+        super().__init__(tokens)
+    # </def>
+
+    # <def>
+    def combine_or(self, left, right):
+        return None
+    # </def>
+
+    # <def>
+    def combine_and(self, left, right):
+        return None
+    # </def>
+
+    # <def>
+    def combine_not(self, operand):
+        return None
+    # </def>
+
+    # <def>
+    def handle_flag(self, flag_name):
+        return None
+    # </def>
+
+    # <def>
+    def handle_comparison(self, var_name, op, number):
+        return None
+    # </def>
+
+    # <def>
+    def process(self):
+        """Override to return nothing - we just want to validate syntax"""
+        super().process()
+        return None
+    # </def>
+# </class ConditionValidator>
+
+# <class>
+class ConditionCompiler(BaseConditionProcessor):
+    """Compiles conditions into nested tuples for adventure_evaluate_condition"""
+    # <def>
+    def combine_or(self, left, right):
+        # <if>
+        if left[0] == 'OR':
+            return ('OR', left[1] + (right,))
+        # </if>
+        return ('OR', (left, right))
+    # </def>
+
+    # <def>
+    def combine_and(self, left, right):
+        # <if>
+        if left[0] == 'AND':
+            return ('AND', left[1] + (right,))
+        # </if>
+        return ('AND', (left, right))
+    # </def>
+
+    # <def>
+    def combine_not(self, operand):
+        return ('NOT', operand)
+    # </def>
+
+    # <def>
+    def handle_flag(self, flag_name):
+        flag_name = flag_name.lower()
+        # <if>
+        if flag_name.endswith('.*'):
+            return ('ANY', flag_name[:-1])
+        # </if>
+        return ('FLAG', flag_name)
+    # </def>
+
+    # <def>
+    def handle_comparison(self, var_name, op, number):
+        return ('CMP', (var_name.lower(), op, number))
+    # </def>
+# </class ConditionCompiler>
+
+# <def>
+def flag_name_known(flag_name, known_lower, known_prefixes=None):
+    """
+    True if a flag name, or a "namespace.*" wildcard, matches a known flag.
+    known_prefixes, when given, holds every namespace prefix such as
+    "quest." of the known flags, so wildcards need not scan them.
+    """
+    flag_name = flag_name.lower()
+    # <if>
+    if flag_name.endswith('.*'):
+        prefix = flag_name[:-1]
+        # <if>
+        if known_prefixes is not None:
+            return prefix in known_prefixes
+        # </if>
+        return any(flag.startswith(prefix) for flag in known_lower)
+    # </if>
+    return flag_name in known_lower
+# </def flag_name_known>
+
+# <def>
+def var_name_known(var_name, vars_lower):
+    """
+    True if a variable name is known, or for a "namespace.*" wildcard, if
+    any known variable is under that namespace.
+    """
+    var_name = var_name.lower()
+    # <if>
+    if var_name.endswith('.*'):
+        prefix = var_name[:-1]
+        return any(var.startswith(prefix) for var in vars_lower)
+    # </if>
+    return var_name in vars_lower
+# </def var_name_known>
+
+# <def>
+def flag_prefixes(flags):
+    """Returns the set of namespace prefixes, such as "quest." and "quest.lighthouse.", of some flags."""
+    prefixes = set()
+    # <for>
+    for flag in flags:
+        dot = flag.find('.')
+        # <while>
+        while dot != -1:
+            prefixes.add(flag[:dot + 1].lower())
+            dot = flag.find('.', dot + 1)
+        # </while>
+    # </for>
+    return prefixes
+# </def flag_prefixes>
+
+# <def>
+def validate_condition(condition, all_known_flags=None, known_vars=(), known_prefixes=None):
+    """
+    Validate a flag condition's syntax and check for unknown flags.
+    
+    Args:
+        condition: String condition to validate
+        all_known_flags: Set of known flag names (case-insensitive), or None to skip flag checking
+        known_vars: Set of known variable names (case-insensitive)
+        known_prefixes: Optional set of the namespace prefixes of all_known_flags
+    
+    Returns:
+        Tuple of (valid, unknown_flags)
+        - valid: True if syntax is correct
+        - unknown_flags: Set of flag and variable names that aren't known
+    """
+    # <if>
+    if not condition.strip():
+        return True, set()
+    # </if>
+    
+    # First, extract all potential flag names regardless of syntax
+    unknown_flags = set()
+    # <if>
+    if all_known_flags is not None:
+        # <try>
+        try:
+            tokens = tokenize(condition)
+            known_lower = {flag.lower() for flag in all_known_flags}
+            vars_lower = {var.lower() for var in known_vars}
+            
+            # Find all FLAG tokens and check if they're unknown.  A name
+            # followed by a comparison is a variable.
+            # <for>
+            for position, (token_type, token_value) in enumerate(tokens):
+                # <if>
+                if token_type != 'FLAG':
+                    continue
+                elif position + 1 < len(tokens) and tokens[position + 1][0] == 'CMP':
+                    # <if>
+                    if not var_name_known(token_value, vars_lower):
+                        unknown_flags.add(token_value)
+                    # </if>
+                elif not flag_name_known(token_value, known_lower, known_prefixes):
+                    unknown_flags.add(token_value)
+                # </if>
+            # </for>
+        except ValueError:
+            # Even if tokenization fails, we still want to try to extract flag-like strings
+            unknown_flags = extract_flag_like_strings(condition, all_known_flags, known_vars, known_prefixes)
+        # </try>
+    # </if>
+    
+    # Now validate syntax
+    # <try>
+    try:
+        tokens = tokenize(condition)
+        validator = ConditionValidator(tokens, all_known_flags)
+        validator.process()
+        return True, unknown_flags
+    except ValueError:
+        return False, unknown_flags
+    # </try>
+# </def validate_condition>
+
+# <def>
+def extract_flag_like_strings(condition, all_known_flags, known_vars=(), known_prefixes=None):
+    """Extract potential flag names from malformed expressions"""
+    unknown_flags = set()
+    known_lower = {flag.lower() for flag in all_known_flags}
+    known_lower.update(var.lower() for var in known_vars)
+    
+    # Simple character-by-character extraction of identifier-like strings
+    i = 0
+    # <while>
+    while i < len(condition):
+        char = condition[i]
+        
+        # If we find the start of an identifier
+        # <if>
+        if char.isalpha() or char == '_':
+            start = i
+            # Continue while we have valid identifier characters
+            # <while>
+            while i < len(condition) and (condition[i].isalnum() or condition[i] in '_.'):
+                i += 1
+            # </while>
+            # <if>
+            if i < len(condition) and condition[i] == '*' and condition[i - 1] == '.':
+                i += 1
+            # </if>
+            
+            potential_flag = condition[start:i]
+            # <if>
+            if not flag_name_known(potential_flag, known_lower, known_prefixes):
+                unknown_flags.add(potential_flag)
+            # </if>
+        else:
+            i += 1
+        # </if>
+    # </while>
+    
+    return unknown_flags
+# </def extract_flag_like_strings>
+
+# <def>
+def check_conditions(conditions, all_known_flags=None, known_vars=(), known_prefixes=None):
+    """
+    Validates each distinct condition once.  Returns a dict of condition to
+    (valid, unknown_flags) for the conditions that are malformed or name
+    unknown flags or variables.
+    """
+    # <if>
+    if all_known_flags is not None and known_prefixes is None:
+        known_prefixes = flag_prefixes(all_known_flags)
+    # </if>
+    problems = {}
+    # <for>
+    for condition in set(conditions):
+        valid, unknown_flags = validate_condition(condition, all_known_flags, known_vars, known_prefixes)
+        # <if>
+        if not valid or unknown_flags:
+            problems[condition] = (valid, unknown_flags)
+        # </if>
+    # </for>
+    return problems
+# </def check_conditions>
+
+# <def>
+def _check_conditions_job(job):
+    return check_conditions(*job)
+# </def>
+
+# <def>
+def check_rooms(rooms, all_known_flags=None, known_vars=(), known_prefixes=None, processes=None):
+    """
+    Validates every interactable condition in a dict of room name to
+    interactables, such as room_definitions.  Returns a list of
+    (room_name, index, condition, valid, unknown_flags) problems, in room
+    order.  With processes greater than 1 the distinct conditions are
+    split across a pool of that many worker processes.
+    """
+    conditions = sorted({
+        interactable.get("condition", "")
+        for interactables in rooms.values()
+        for interactable in interactables
+    })
+    # <if>
+    if all_known_flags is not None and known_prefixes is None:
+        known_prefixes = flag_prefixes(all_known_flags)
+    # </if>
+    # <if>
+    if processes and processes > 1 and len(conditions) > processes:
+        known = (
+            None if all_known_flags is None else set(all_known_flags),
+            set(known_vars),
+            None if known_prefixes is None else set(known_prefixes),
+        )
+        import multiprocessing
+        jobs = [(conditions[start::processes],) + known for start in range(processes)]
+        problems = {}
+        # <with>
+        with multiprocessing.Pool(processes) as pool:
+            # <for>
+            for result in pool.imap_unordered(_check_conditions_job, jobs):
+                problems.update(result)
+            # </for>
+        # </with>
+    else:
+        problems = check_conditions(conditions, all_known_flags, known_vars, known_prefixes)
+    # </if>
+    result = []
+    # <for>
+    for room_name, interactables in rooms.items():
+        # <for>
+        for index, interactable in enumerate(interactables):
+            condition = interactable.get("condition", "")
+            # <if>
+            if condition in problems:
+                result.append((room_name, index, condition) + problems[condition])
+            # </if>
+        # </for>
+    # </for>
+    return result
+# </def check_rooms>
+
+# <def>
+def format_problem(problem):
+    room_name, index, condition, valid, unknown_flags = problem
+    details = []
+    # <if>
+    if not valid:
+        details.append("syntax error")
+    # </if>
+    # <if>
+    if unknown_flags:
+        details.append("unknown: " + ", ".join(sorted(unknown_flags)))
+    # </if>
+    return f'{room_name} #{index}: "{condition}" ({"; ".join(details)})'
+# </def format_problem>
+
+# <def>
+def load_room_definitions(path):
+    """Reads room_definitions from a room_data.rpy file exported by the editor."""
+    # <with>
+    with open(path, encoding="utf-8") as f:
+        lines = f.read().split("\n")
+    # </with>
+    # The export is a single "init python:" block.
+    start = next(i for i, line in enumerate(lines) if line.strip().startswith("init python"))
+    tree = ast.parse(textwrap.dedent("\n".join(lines[start + 1:])))
+    # <for>
+    for node in tree.body:
+        # <if>
+        if isinstance(node, ast.Assign) and any(getattr(target, "id", None) == "room_definitions" for target in node.targets):
+            return ast.literal_eval(node.value)
+        # </if>
+    # </for>
+    raise ValueError(f"No room_definitions found in {path}")
+# </def load_room_definitions>
+
+# <def>
+def load_names(path):
+    """Reads declared names from a file, one per line or separated by commas, with # comments."""
+    names = set()
+    # <with>
+    with open(path, encoding="utf-8") as f:
+        # <for>
+        for line in f:
+            # <for>
+            for name in line.split("#", 1)[0].replace(";", ",").split(","):
+                # <if>
+                if name.strip():
+                    names.add(name.strip())
+                # </if>
+            # </for>
+        # </for>
+    # </with>
+    return names
+# </def load_names>
+
+# <def>
+def main(argv):
+    import argparse
+    import multiprocessing
+    parser = argparse.ArgumentParser(description="Check the conditions in Adventure room data.")
+    parser.add_argument("room_data", nargs="+", help="room_data.rpy files exported by the editor")
+    parser.add_argument("--flags", help="file of declared flag names")
+    parser.add_argument("--vars", help="file of declared variable names")
+    parser.add_argument("--processes", type=int, default=multiprocessing.cpu_count(), help="worker processes (default: one per CPU)")
+    args = parser.parse_args(argv)
+    rooms = {}
+    # <for>
+    for path in args.room_data:
+        rooms.update(load_room_definitions(path))
+    # </for>
+    known_flags = load_names(args.flags) if args.flags else None
+    known_vars = load_names(args.vars) if args.vars else ()
+    problems = check_rooms(rooms, known_flags, known_vars, processes=args.processes)
+    # <for>
+    for problem in problems:
+        print(format_problem(problem))
+    # </for>
+    print(f"{len(problems)} problem(s) in {sum(len(interactables) for interactables in rooms.values())} interactables")
+    return 1 if problems else 0
+# </def main>
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))